@@ -1,8 +1,11 @@
 import json
 import re
+import tempfile
+from functools import lru_cache
 from pathlib import Path
 
 # ---------- Canonicalization (single source of truth) ----------
+@lru_cache(maxsize=1024)  # same handful of names canonicalized per view/folder on every run
 def canonicalize(text: str) -> str:
     """
     Normalize a string into a stable, filesystem- and key-safe form.
@@ -18,7 +21,11 @@ def canonicalize(text: str) -> str:
 
 def build_view_key(view: dict) -> str:
     """Create the canonical key 'sat_sec_im' for a view dict."""
-    return canonicalize(f"{view['sat']}_{view['sec']}_{view['im']}")
+    return _view_key(view['sat'], view['sec'], view['im'])
+
+@lru_cache(maxsize=512)
+def _view_key(sat: str, sec: str, im: str) -> str:
+    return canonicalize(f"{sat}_{sec}_{im}")
 
 # ---------- Config load ----------
 _ROOT = Path(__file__).parent
@@ -35,7 +42,6 @@ else:
         "logs_dir": str(_ROOT / "logs"),
         "wallpaper_engine_path": r"C:\Program Files (x86)\Steam\steamapps\common\wallpaper_engine\wallpaper64.exe",
         "steam_protocol": "steam://rungameid/431960",
-        "deploy_script_name": "deploy-wallpaper.py",
         "homepage_url": "https://rammb2.cira.colostate.edu/"
     }
 
@@ -45,8 +51,13 @@ STATIC_DIR = Path(_cfg["static_dir"])
 LOGS_DIR = Path(_cfg["logs_dir"])
 WALLPAPER_ENGINE_EXE = _cfg["wallpaper_engine_path"]
 STEAM_PROTOCOL = _cfg["steam_protocol"]
-DEPLOY_SCRIPT_NAME = _cfg["deploy_script_name"]
 HOMEPAGE_URL = _cfg["homepage_url"]
+# Written by deploy-wallpaper.py (contains its PID) while a deploy runs; watched by the daemon.
+# This is the only deploy detection: renamed/packaged deploy launchers must still run
+# deploy-wallpaper.py's main() (the old 'deploy_script_name' key is no longer read).
+DEPLOY_SENTINEL = Path(tempfile.gettempdir()) / "satwall_deploy.pid"
+# Windows named event pulsed by deploy-wallpaper.py on start/exit so the daemon wakes immediately
+DEPLOY_EVENT_NAME = "Local\\SatWallDeploy"
 
 # Ensure key dirs exist (non-fatal)
 for _p in (OUTPUT_BASE_DIR, STATIC_DIR, LOGS_DIR):
@@ -1,10 +1,18 @@
 # deploy-wallpaper.py
 import os
-import json
+import sys
+import atexit
+import mmap
 import shutil
-from json import JSONDecodeError
+import ctypes
+from concurrent.futures import ThreadPoolExecutor
+from json import JSONDecodeError  # orjson.JSONDecodeError subclasses this
+try:
+    from orjson import loads as _json_loads  # optional: parses bytes directly, much faster
+except ImportError:
+    from json import loads as _json_loads  # stdlib also accepts UTF-8 bytes
 from pathlib import Path
-from config_loader import OUTPUT_BASE_DIR, build_view_key, canonicalize  # shared helpers
+from config_loader import OUTPUT_BASE_DIR, DEPLOY_SENTINEL, DEPLOY_EVENT_NAME, build_view_key, canonicalize  # shared helpers
 
 PROJECTS_JSON_PATH = Path("projects.json")
 VIEWS_JSON_PATH = Path("views_config.json")
@@ -12,103 +20,352 @@ VIEWS_JSON_PATH = Path("views_config.json")
 # Optional: set STAGE_ONLY=1 to skip copying into Wallpaper Engine (creates/updates staging only)
 STAGE_ONLY = os.environ.get("STAGE_ONLY", "0") == "1"
 
+# Shared I/O pool for per-frame copies (reused across all views processed by main)
+_COPY_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 4) * 2))
 
-def find_parent_dir_for_key(output_root: Path, canonical_key: str) -> Path | None:
+
+def _signal_daemon() -> None:
+    """Wake wallpaper_daemon right away via its named event (Windows only; no-op elsewhere)."""
+    if os.name != "nt":
+        return
+    from ctypes import wintypes
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateEventW.restype = wintypes.HANDLE
+    handle = kernel32.CreateEventW(None, False, False, DEPLOY_EVENT_NAME)
+    if handle:
+        kernel32.SetEvent(wintypes.HANDLE(handle))
+        kernel32.CloseHandle(wintypes.HANDLE(handle))
+
+
+def _fast_copy(src, dst) -> None:
+    """
+    Copy src -> dst (file path, not folder) using the OS copy engine, preserving mtime.
+    Windows: CopyFileW. Linux: os.sendfile (kernel-side, no userspace buffers).
+    macOS: shutil.copy2 (fcopyfile). Anything else, or a filesystem that rejects
+    sendfile, streams in 1 MiB chunks so memory stays bounded regardless of frame size.
+    """
+    src, dst = os.fspath(src), os.fspath(dst)
+    if os.name == "nt":
+        if not ctypes.windll.kernel32.CopyFileW(src, dst, False):
+            raise ctypes.WinError()
+        return
+    if sys.platform == "darwin":
+        shutil.copy2(src, dst)
+        return
+
+    st = os.stat(src)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        offset = 0
+        if sys.platform.startswith("linux"):
+            try:
+                while offset < st.st_size:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, st.st_size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError:
+                pass  # e.g. EINVAL/ENOSYS on some network/FUSE mounts: stream the rest
+        if offset < st.st_size:
+            fsrc.seek(offset)
+            fdst.seek(offset)
+            shutil.copyfileobj(fsrc, fdst, length=1 << 20)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def _clone_or_copy(src, dst) -> None:
+    """
+    Give dst its own copy of src: reflink (FICLONE, Linux CoW filesystems) where
+    possible, else a real copy. Written to dst + ".tmp" and swapped in with
+    os.replace, so readers (Wallpaper Engine) never see a missing or half-written
+    file, and an old hardlink at dst is replaced rather than written through.
+    """
+    src, dst = os.fspath(src), os.fspath(dst)
+    tmp = dst + ".tmp"
+    try:
+        os.unlink(tmp)
+    except FileNotFoundError:
+        pass
+
+    try:
+        cloned = False
+        if sys.platform.startswith("linux"):
+            import fcntl
+            FICLONE = 0x40049409
+            try:
+                with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                st = os.stat(src)
+                os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+                cloned = True
+            except OSError:
+                pass
+        if not cloned:
+            _fast_copy(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _link_or_copy(src, dst) -> None:
+    """
+    Materialize src at dst as cheaply as possible: hardlink, else _clone_or_copy.
+    Only for internal staging files: a hardlink follows any later in-place rewrite
+    of src (working_fetcher re-extracts into reused run folders), so anything
+    Wallpaper Engine reads must use _clone_or_copy instead.
+    """
+    src, dst = os.fspath(src), os.fspath(dst)
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass  # cross-device (EXDEV), unsupported FS, etc.
+
+    _clone_or_copy(src, dst)
+
+
+def index_output_dirs(output_root: Path) -> dict[str, Path]:
+    """
+    Map canonicalized folder name -> folder for every subfolder of output_root, so
+    per-view lookups are a dict probe instead of a directory scan. A folder whose
+    name is already canonical wins over a legacy folder that canonicalizes to it.
+    Symlinked folders count, matching find_parent_dir_for_key's non-index path.
+    """
+    index: dict[str, Path] = {}
+    with os.scandir(output_root) as it:
+        for e in it:
+            if not e.is_dir():  # follows symlinks (same rule as find_parent_dir_for_key)
+                continue
+            canon = canonicalize(e.name)
+            if canon == e.name or canon not in index:
+                index[canon] = Path(e.path)
+    return index
+
+
+def find_parent_dir_for_key(output_root: Path, canonical_key: str,
+                            index: dict[str, Path] | None = None) -> Path | None:
     """
     Return the folder under output_root that corresponds to the canonical_key.
+    With a precomputed index (see index_output_dirs) this is a single lookup.
     Primary match: exact folder named canonical_key.
     Fallback: scan subfolders and match canonicalized names (handles legacy folders with symbols like µ).
     """
+    if index is not None:
+        return index.get(canonical_key)
+
     direct = output_root / canonical_key
     if direct.is_dir():
         return direct
 
     # Fallback scan (legacy symbols, mixed unicode)
-    for child in output_root.iterdir():
-        if not child.is_dir():
-            continue
-        if canonicalize(child.name) == canonical_key:
-            return child
+    with os.scandir(output_root) as it:
+        for e in it:
+            if not e.is_dir():  # follows symlinks, like direct.is_dir() above
+                continue
+            if canonicalize(e.name) == canonical_key:
+                return Path(e.path)
 
     return None
 
 
-def stage_from_latest_run(parent_dir: Path) -> Path | None:
+def _same_file(a, b) -> bool:
+    """True if b already holds exactly a's bytes (same inode, or equal size and content)."""
+    try:
+        sa, sb = os.stat(a), os.stat(b)
+    except OSError:
+        return False
+    if os.path.samestat(sa, sb):
+        return True
+    if sa.st_size != sb.st_size:
+        return False
+    if sa.st_size == 0:
+        return True  # mmap can't map empty files
+    with open(a, "rb") as fa, open(b, "rb") as fb, \
+            mmap.mmap(fa.fileno(), 0, access=mmap.ACCESS_READ) as ma, \
+            mmap.mmap(fb.fileno(), 0, access=mmap.ACCESS_READ) as mb:
+        with memoryview(ma) as va, memoryview(mb) as vb:
+            return va == vb
+
+
+def _stage_frame(src: str, staged: str | None, deployed: str | None) -> None:
+    """Place one source frame into staging and/or WE materials, both straight from src."""
+    if staged is not None:
+        _link_or_copy(src, staged)
+    if deployed is not None:
+        _clone_or_copy(src, deployed)  # independent file: never shares the source inode
+
+
+def _read_marker(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_marker(path: str, text: str) -> None:
+    """Write via temp file + os.replace so a crash never leaves a truncated marker."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _stamp_matches(stamp: str | None, run_mtime_ns: int, run_name: str) -> bool:
+    """stamp is "<run mtime_ns> <frame count> <run folder name>"; False if unparseable."""
+    try:
+        mt, _, name = stamp.split(" ", 2)
+        return int(mt) == run_mtime_ns and name == run_name
+    except (AttributeError, ValueError):
+        return False
+
+
+def _frames_present(stamp: str, frames_dir: str) -> bool:
+    """Check every frame the stamp promises still exists in frames_dir (one scandir)."""
+    try:
+        count = int(stamp.split(" ")[1])
+    except (ValueError, IndexError):
+        return False  # unparseable marker: treat as stale
+    try:
+        with os.scandir(frames_dir) as it:
+            names = {e.name for e in it}
+    except OSError:
+        return False
+    return count > 0 and all(f"frame_{i:03d}.png" in names for i in range(count))
+
+
+def stage_from_latest_run(parent_dir: Path, materials_path: Path | None = None) -> Path | None:
     """
     Create/update a staging folder from the latest timestamped run folder.
+    If materials_path is given, frames are deployed there in the same pass (each
+    destination is filled directly from the source run, never staging -> materials).
     Returns the staging path or None if unavailable.
     """
     # pick latest timestamped run by mtime (not by name)
-    all_runs = [d for d in parent_dir.iterdir() if d.is_dir() and d.name != 'staging']
-    if not all_runs:
+    # (DirEntry caches the directory-listing metadata, so no extra stat per entry)
+    best, best_mt = None, -1
+    with os.scandir(parent_dir) as it:
+        for e in it:
+            if e.name == 'staging' or not e.is_dir(follow_symlinks=False):
+                continue
+            mt = e.stat(follow_symlinks=False).st_mtime_ns
+            if mt > best_mt:
+                best_mt, best = mt, e
+    if best is None:
         print(f"  ❌ No downloaded frame sets found in {parent_dir}")
         return None
 
-    latest_run_folder = max(all_runs, key=lambda d: d.stat().st_mtime)
+    latest_run_folder = Path(best.path)
     print(f"  [1/4] Latest source frames: {latest_run_folder.name}")
 
     # staging
     staging_dir = parent_dir / "staging"
     staging_dir.mkdir(exist_ok=True)
 
+    # plain strings from here on: no Path construction / __fspath__ per frame
+    staging_str = os.fspath(staging_dir)
+    materials_str = os.fspath(materials_path) if materials_path is not None else None
+
+    # Skip work already done for this exact run (same folder name and mtime, and every
+    # frame still present). Markers live in staging (not in WE's materials folder) and
+    # are only written after a complete pass. Frame contents are not re-verified.
+    stage_marker = os.path.join(staging_str, ".last_src_mtime")
+    deploy_marker = os.path.join(staging_str, ".last_deployed_mtime")
+    recorded = _read_marker(stage_marker)
+    stage_fresh = (_stamp_matches(recorded, best_mt, best.name)
+                   and _frames_present(recorded, staging_str))
+    deploy_fresh = materials_str is None or (
+        stage_fresh and _read_marker(deploy_marker) == f"{recorded}\n{materials_str}"
+        and _frames_present(recorded, materials_str))
+    if stage_fresh:
+        print("  [2/4] Staging up-to-date — skipping stage.")
+        if deploy_fresh:
+            if materials_str is not None:
+                print("  [3/4] Wallpaper Engine frames up-to-date — skipping deploy.")
+            return staging_dir
+    else:
+        print(f"  [2/4] Staging and renaming frames...")
+
     # copy & rename
-    print(f"  [2/4] Staging and renaming frames...")
-    source_files = sorted(latest_run_folder.glob("*.png"))
+    with os.scandir(latest_run_folder) as it:
+        source_files = [e.path for e in it if e.name.lower().endswith(".png") and e.is_file()]
+    source_files.sort()
     if not source_files:
         print("  ❌ No .png frames found in the latest folder.")
         return None
 
+    if materials_str is not None:
+        print(f"  [3/4] Deploying to Wallpaper Engine...")
+    tasks = []
     for i, frame_path in enumerate(source_files):
-        (staging_dir / f"frame_{i:03d}.png").write_bytes(frame_path.read_bytes())
-    print(f"  ✅ Staged and renamed {len(source_files)} frames.")
-
-    # Copy manifest for provenance if present
-    src_manifest = latest_run_folder / "manifest.json"
-    if src_manifest.exists():
-        shutil.copy2(src_manifest, staging_dir / "current_manifest.json")
+        name = f"frame_{i:03d}.png"
+        tasks.append((frame_path,
+                      None if stage_fresh else os.path.join(staging_str, name),
+                      os.path.join(materials_str, name) if materials_str else None))
+    list(_COPY_POOL.map(lambda t: _stage_frame(*t), tasks))
+
+    stage_stamp = f"{best_mt} {len(source_files)} {best.name}"
+    if not stage_fresh:
+        print(f"  ✅ Staged and renamed {len(source_files)} frames.")
+        # Copy manifest for provenance if present
+        src_manifest = os.path.join(best.path, "manifest.json")
+        staged_manifest = os.path.join(staging_str, "current_manifest.json")
+        if os.path.exists(src_manifest) and not _same_file(src_manifest, staged_manifest):
+            _link_or_copy(src_manifest, staged_manifest)
+        _write_marker(stage_marker, stage_stamp)
+    if materials_str is not None:
+        print(f"  ✅ Deployment complete. Copied {len(source_files)} frames.")
+        _write_marker(deploy_marker, f"{stage_stamp}\n{materials_str}")
 
     return staging_dir
 
 
-def deploy_latest_frames(view_config: dict, project_path_str: str):
+def deploy_latest_frames(view_config: dict, project_path_str: str,
+                         output_index: dict[str, Path] | None = None):
     project_path = Path(project_path_str)
     key = build_view_key(view_config)
 
     print(f"\n{'='*20}\n➡️  Deploying '{key}'\n{'='*20}")
 
     # Locate the parent output directory robustly (handles legacy unicode)
-    parent_dir = find_parent_dir_for_key(OUTPUT_BASE_DIR, key)
+    parent_dir = find_parent_dir_for_key(OUTPUT_BASE_DIR, key, output_index)
     if parent_dir is None:
         print(f"  ❌ Source folder not found for key: {key} (under {OUTPUT_BASE_DIR})")
         return
 
-    staging_dir = stage_from_latest_run(parent_dir)
-    if staging_dir is None:
-        return
-
     if STAGE_ONLY:
+        if stage_from_latest_run(parent_dir) is None:
+            return
         print("  [3/4] Stage-only mode: skipping copy to Wallpaper Engine.")
         print("  [4/4] Cleanup skipped — originals & staging preserved.")
         return
 
-    # deploy to Wallpaper Engine materials
+    # deploy to Wallpaper Engine materials (in the same pass as staging)
     materials_path = project_path / "materials"
     if not materials_path.is_dir():
         print(f"  ❌ 'materials' subfolder not found in {project_path}")
         return
 
-    print(f"  [3/4] Deploying to Wallpaper Engine...")
-    copied = 0
-    for new_frame in sorted(staging_dir.glob("frame_*.png")):
-        shutil.copy2(str(new_frame), str(materials_path))  # copy2 preserves mtime
-        copied += 1
-    print(f"  ✅ Deployment complete. Copied {copied} frames.")
+    staging_dir = stage_from_latest_run(parent_dir, materials_path)
+    if staging_dir is None:
+        return
 
     # Drop a copy of the current manifest next to the project for reference
     try:
         manifest_in_stage = staging_dir / "current_manifest.json"
-        if manifest_in_stage.exists():
-            shutil.copy2(manifest_in_stage, project_path / "current_manifest.json")
+        manifest_in_project = project_path / "current_manifest.json"
+        # independent snapshot of what was deployed (replaces any symlink left by older versions)
+        if manifest_in_stage.exists() and (manifest_in_project.is_symlink()
+                                           or not _same_file(manifest_in_stage, manifest_in_project)):
+            _clone_or_copy(manifest_in_stage, manifest_in_project)
             print("  ℹ️  Wrote current_manifest.json to project folder.")
     except Exception as e:
         print(f"  ⚠️  Could not copy manifest into project: {e}")
@@ -117,9 +374,15 @@ def deploy_latest_frames(view_config: dict, project_path_str: str):
 
 
 def main():
+    # announce ourselves to wallpaper_daemon (removed again on exit)
+    DEPLOY_SENTINEL.write_text(str(os.getpid()))
+    atexit.register(_signal_daemon)  # atexit is LIFO: runs after the unlink below
+    atexit.register(DEPLOY_SENTINEL.unlink, missing_ok=True)
+    _signal_daemon()
+
     # load configs
     try:
-        views = json.loads(VIEWS_JSON_PATH.read_text(encoding="utf-8"))
+        views = _json_loads(VIEWS_JSON_PATH.read_bytes())
     except FileNotFoundError:
         print(f"❌ Missing {VIEWS_JSON_PATH}")
         return
@@ -128,7 +391,7 @@ def main():
         return
 
     try:
-        projs_raw = json.loads(PROJECTS_JSON_PATH.read_text(encoding="utf-8"))
+        projs_raw = _json_loads(PROJECTS_JSON_PATH.read_bytes())
     except FileNotFoundError:
         print(f"❌ Missing {PROJECTS_JSON_PATH}")
         return
@@ -140,21 +403,19 @@ def main():
     projects: dict[str, str] = {}
     for p in projs_raw:
         name = p.get("view_name_base", "")
-        normalized = canonicalize(name)
-        projects[normalized] = p["project_path"]
+        projects[canonicalize(name)] = p["project_path"]
+
+    # one scan of the output root serves every view's folder lookup
+    output_index = index_output_dirs(OUTPUT_BASE_DIR)
 
     # deploy each matching view
     for view in views:
         key = build_view_key(view)
+        # build_view_key is already canonical, so a single probe covers every project
         if key in projects:
-            deploy_latest_frames(view, projects[key])
+            deploy_latest_frames(view, projects[key], output_index)
         else:
-            # Fallback: try canonicalized form of our own key (defensive)
-            alt_key = canonicalize(key)
-            if alt_key in projects:
-                deploy_latest_frames(view, projects[alt_key])
-            else:
-                print(f"ℹ️  Skipping '{key}' — no matching entry in projects.json")
+            print(f"ℹ️  Skipping '{key}' — no matching entry in projects.json")
 
     print("\n✅ All deployment tasks complete.")
 
@@ -0,0 +1,56 @@
+# static_picker.py
+# Time-of-day static image selection (no comtypes/COM dependency, cheap to import)
+
+import os
+import random
+from pathlib import Path
+from datetime import datetime
+from typing import List
+
+# Tuple (not set) so str.endswith can take it directly; match against name.lower()
+_IMG_EXTS = (".png", ".jpg", ".jpeg")
+
+def time_band_now() -> str:
+    hour = datetime.now().hour
+    if 5 <= hour < 11:
+        return "morning"
+    if 11 <= hour < 17:
+        return "afternoon"
+    if 17 <= hour < 22:
+        return "evening"
+    # late night
+    return "evening"
+
+def _scan_images(folder: Path) -> List[Path]:
+    """Images directly inside folder (single scandir pass; Path built only for matches)."""
+    with os.scandir(folder) as it:
+        return [Path(e.path) for e in it if e.name.lower().endswith(_IMG_EXTS)]
+
+def _fast_candidates(root: Path, needed: int, mult: int = 8) -> List[str]:
+    """Walk root for images, stopping once needed * mult have been found (no Path per file)."""
+    out = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(_IMG_EXTS):
+                out.append(os.path.join(dirpath, name))
+                if len(out) >= needed * mult:
+                    return out
+    return out
+
+def pick_images_for_monitors(static_root: Path, count: int) -> List[Path]:
+    """Pick 'count' images matching time-of-day; if folder sparse, fall back to any."""
+    band = time_band_now()
+    band_dir = static_root / band
+    candidates = []
+    if band_dir.is_dir():
+        candidates = _scan_images(band_dir)
+    # Optional: at night, sometimes pull from 'space'
+    if not candidates or random.random() < 0.25:
+        space_dir = static_root / "space"
+        if space_dir.is_dir():
+            candidates += _scan_images(space_dir)
+    # Final fallback: any (bounded walk — stop once we have plenty to choose from)
+    if not candidates:
+        found = _fast_candidates(static_root, count)
+        return [Path(p) for p in random.sample(found, min(count, len(found)))]
+    return random.sample(candidates, min(count, len(candidates)))
@@ -1,29 +1,113 @@
+import os
+import ctypes
 import random
 import time
-import subprocess
 from pathlib import Path
-from config_loader import STATIC_DIR, STEAM_PROTOCOL, DEPLOY_SCRIPT_NAME
+from config_loader import STATIC_DIR, STEAM_PROTOCOL, DEPLOY_SENTINEL, DEPLOY_EVENT_NAME
 
-CHECK_INTERVAL = 5  # seconds
+CHECK_INTERVAL = 5  # seconds (after any state change)
+MAX_INTERVAL = 60   # seconds (idle back-off cap)
+
+SPI_SETDESKWALLPAPER = 20
+SPIF_UPDATEINIFILE_SENDCHANGE = 0x01 | 0x02
 
 def set_static_wallpaper(image_path: Path):
-    subprocess.run([
-        "powershell", "-command",
-        (
-            '[System.Reflection.Assembly]::LoadWithPartialName("System.Windows.Forms") | Out-Null;'
-            f'[System.Windows.Forms.SystemParametersInfo]::SetDesktopWallpaper("{image_path.resolve()}", 1, 0)'
-        )
-    ], check=False)
+    # direct user32 call — no PowerShell process per switch
+    ctypes.windll.user32.SystemParametersInfoW(
+        SPI_SETDESKWALLPAPER, 0, str(image_path.resolve()), SPIF_UPDATEINIFILE_SENDCHANGE)
 
 def restore_wallpaper_engine():
-    subprocess.Popen(["start", "", STEAM_PROTOCOL], shell=True)
+    os.startfile(STEAM_PROTOCOL)  # ShellExecuteW directly, no cmd.exe
+
+# Where a process start time can't be determined, a sentinel older than this is stale
+SENTINEL_MAX_AGE = 6 * 3600  # seconds
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) would terminate the process on Windows; query it instead
+        from ctypes import wintypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            code = wintypes.DWORD()
+            return bool(kernel32.GetExitCodeProcess(wintypes.HANDLE(handle), ctypes.byref(code))) \
+                and code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(wintypes.HANDLE(handle))
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _process_start_time(pid: int) -> float | None:
+    """Epoch seconds at which pid was created, or None if it can't be determined."""
+    if os.name == "nt":
+        from ctypes import wintypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        kernel32 = ctypes.windll.kernel32
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            creation, exited, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            if not kernel32.GetProcessTimes(wintypes.HANDLE(handle), ctypes.byref(creation), ctypes.byref(exited),
+                                            ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            ticks = (creation.dwHighDateTime << 32) | creation.dwLowDateTime  # 100ns since 1601
+            return (ticks - 116444736000000000) / 1e7
+        finally:
+            kernel32.CloseHandle(wintypes.HANDLE(handle))
+    try:
+        # field 22 (starttime, clock ticks since boot); split after ")" since comm may hold spaces
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat", encoding="utf-8") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith("btime "))
+        return btime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
 
 def is_deploy_running():
+    # deploy-wallpaper.py writes its PID to the sentinel and removes it on exit. If it was
+    # killed instead, the file lingers and the PID may be reused: only trust a live process
+    # that already existed when the sentinel was written.
     try:
-        tasks = subprocess.check_output(['tasklist'], shell=True).decode(errors="ignore").lower()
-        return DEPLOY_SCRIPT_NAME.lower() in tasks or ("python" in tasks and "deploy-wallpaper.py" in tasks)
-    except Exception:
+        written_at = DEPLOY_SENTINEL.stat().st_mtime
+        pid = int(DEPLOY_SENTINEL.read_text())
+    except (OSError, ValueError):
+        return False
+    if not _pid_alive(pid):
         return False
+    started = _process_start_time(pid)
+    if started is None:
+        return time.time() - written_at < SENTINEL_MAX_AGE
+    return started <= written_at + 2  # slack for timestamp granularity
+
+def _open_deploy_event():
+    """Named auto-reset event that deploy-wallpaper.py signals on start/exit (Windows only)."""
+    if os.name != "nt":
+        return None
+    from ctypes import wintypes
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateEventW.restype = wintypes.HANDLE
+    handle = kernel32.CreateEventW(None, False, False, DEPLOY_EVENT_NAME)
+    return wintypes.HANDLE(handle) if handle else None
+
+def _wait_for_deploy_event(event, seconds: float):
+    """Block until the deploy event fires or the timeout elapses."""
+    if event is None:
+        time.sleep(seconds)
+    else:
+        ctypes.windll.kernel32.WaitForSingleObject(event, int(seconds * 1000))
 
 def pick_random_static():
     choices = list(STATIC_DIR.glob("*.jpg")) + list(STATIC_DIR.glob("*.png"))
@@ -31,9 +115,12 @@ def pick_random_static():
 
 def daemon_loop():
     last_state = None  # None | "static" | "satellite"
+    idle_ticks = 0
+    event = _open_deploy_event()
     print("[DAEMON] Running. Watching for deploy activity...")
     while True:
         deploy_active = is_deploy_running()
+        prev_state = last_state
 
         if deploy_active and last_state != "static":
             print("[DAEMON] Detected deploy activity. Switching to static image.")
@@ -49,7 +136,9 @@ def daemon_loop():
             restore_wallpaper_engine()
             last_state = "satellite"
 
-        time.sleep(CHECK_INTERVAL)
+        # back off exponentially while nothing changes; snap back after a transition
+        idle_ticks = 0 if last_state != prev_state else idle_ticks + 1
+        _wait_for_deploy_event(event, min(MAX_INTERVAL, CHECK_INTERVAL * (1 << min(idle_ticks, 4))))
 
 if __name__ == "__main__":
     daemon_loop()